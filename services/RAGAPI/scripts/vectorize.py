@@ -6,101 +6,506 @@ This script processes documents from the documents/ directory and sends them
 to the RAGAPI for vectorization and storage.
 """
 
+import asyncio
+import functools
+import itertools
+import mmap
+import multiprocessing
 import os
+import queue
+import re
+import sqlite3
 import sys
 import requests
 import json
 import hashlib
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from importlib.metadata import PackageNotFoundError, version
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Callable, Generator, Iterable, Iterator, List, Tuple, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+def _has_package(name: str) -> bool:
+    """Check whether a distribution is installed without importing it."""
+    try:
+        version(name)
+        return True
+    except PackageNotFoundError:
+        return False
+
+# Document parsers are slow to import, so they are detected here and
+# imported on first use
+HAS_PDF = _has_package("pdfplumber")
+HAS_PDFIUM = _has_package("pypdfium2")  # Native PDFium bindings, much faster than pdfplumber
+HAS_DOCX = _has_package("python-docx")
+HAS_TOKENIZERS = _has_package("tokenizers")
+
+try:
+    from blake3 import blake3
+    HAS_BLAKE3 = True
+except ImportError:
+    HAS_BLAKE3 = False
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 try:
-    import pdfplumber
-    HAS_PDF = True
+    import msgpack
+    HAS_MSGPACK = True
 except ImportError:
-    HAS_PDF = False
+    HAS_MSGPACK = False
 
 try:
-    from docx import Document
-    HAS_DOCX = True
+    import zstandard
+    HAS_ZSTD = True
 except ImportError:
-    HAS_DOCX = False
+    HAS_ZSTD = False
 
 # Configuration
 RAG_API_BASE_URL = "http://localhost:9101"  # Default RAGAPI port
 DOCUMENTS_DIR = "../documents"  # Relative to scripts directory
+HASH_BUFFER_SIZE = 1 << 20  # Slice of the mapped file fed to each SHA-256 update
+HASH_CACHE_SIZE = 4096  # File hashes memoized per process, keyed by (path, mtime, size)
+CACHE_DB_FILE = os.environ.get("VECTORIZE_CACHE_DB", ".vectorize_cache.db")  # Processed files across runs
+CHUNK_INDEX_FILE = os.environ.get("VECTORIZE_CHUNK_INDEX", "chunks.idx")  # Hashes of uploaded chunks
+# Extraction/chunking is CPU-bound; lower this on rotating disks to avoid seek thrash
+MAX_WORKERS = int(os.environ.get("VECTORIZE_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+# Chunks are sized to the embedding model's token window rather than a fixed character count
+MAX_TOKENS = int(os.environ.get("VECTORIZE_MAX_TOKENS", 510))
+TOKENIZER_NAME = os.environ.get("VECTORIZE_TOKENIZER")  # Hugging Face id or tokenizer.json; heuristic if unset
+TOKEN_SAMPLE_CHARS = 8192  # Text sampled per document to estimate characters per token
+CJK_CHARS = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]")
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt', '.md')
+SENTENCE_ENDINGS = ['. ', '! ', '? ', '\n\n']  # Preferred chunk break points, in priority order
+BREAK_WINDOW = 100  # Chunks may end at most this many characters early to land on a sentence end
+# (ending, length, length without trailing whitespace), computed once rather than per chunk
+SENTENCE_BREAKS = tuple((ending, len(ending), len(ending.rstrip())) for ending in SENTENCE_ENDINGS)
+SUBMIT_WORKERS = 32  # Concurrent threads posting chunks to the API
+BATCH_SIZE = int(os.environ.get("VECTORIZE_BATCH_SIZE", 64))  # Chunks per /process-documents call
+BATCH_FLUSH_INTERVAL = 0.1  # Seconds a partial batch may wait before being sent
+MAX_IN_FLIGHT = 32  # Concurrent batch requests per run, across all files
+CHUNK_QUEUE_SIZE = 64  # Chunks buffered per file between the parser and the uploader
+CHUNK_GROUP_SIZE = 16  # Chunks per queue item, amortizing the hand-off from worker processes
+COMPRESS_MIN_BYTES = 1024  # Smaller batch bodies are sent uncompressed
+HTTP_RETRIES = 3  # Retries for connection failures (and 502/503/504 on GET)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+MSGPACK_HEADERS = {"Content-Type": "application/msgpack"}
+
+def json_dumps(obj) -> bytes:
+    """Serialize a request body, using orjson when available."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+def json_loads(data: bytes):
+    """Parse a response body, using orjson when available; raises ValueError if malformed."""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+_thread_state = threading.local()
+
+def _zstd_compressor():
+    """Return this thread's zstd compressor (compressors are not thread-safe)."""
+    if not hasattr(_thread_state, "compressor"):
+        _thread_state.compressor = zstandard.ZstdCompressor(level=1)
+    return _thread_state.compressor
+
+def encode_batch(items: List[dict]) -> Tuple[bytes, dict]:
+    """Encode a /process-documents body and its headers, as MessagePack when available.
+
+    Bodies of at least COMPRESS_MIN_BYTES are zstd-compressed when zstandard is installed.
+    """
+    payload = {"documents": items}
+    if HAS_MSGPACK:
+        body, headers = msgpack.packb(payload), MSGPACK_HEADERS
+    else:
+        body, headers = json_dumps(payload), JSON_HEADERS
+    if HAS_ZSTD and len(body) >= COMPRESS_MIN_BYTES:
+        body = _zstd_compressor().compress(body)
+        headers = {**headers, "Content-Encoding": "zstd"}
+    return body, headers
+
+def create_session() -> requests.Session:
+    """Create a keep-alive session that retries transient failures where it is safe.
+
+    POSTs are only retried when the connection failed. A timeout or gateway
+    error may arrive while the server is still embedding the batch, and
+    resending it would repeat that Bedrock work; /process-document also
+    rejects content it has already stored.
+    """
+    # The default allowed_methods exclude POST from read and status retries
+    retry = Retry(total=HTTP_RETRIES, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@functools.lru_cache(maxsize=HASH_CACHE_SIZE)
+def _cached_file_hash(path: str, mtime_ns: int, size: int) -> str:
+    """Hash a file; mtime and size are only part of the key, so edits invalidate it.
+
+    The hash is prefixed with its algorithm, so hashes persisted by a run with a
+    different set of optional packages never match by accident.
+    """
+    if HAS_BLAKE3:
+        hasher = blake3(max_threads=blake3.AUTO)
+        hasher.update_mmap(path)
+        return f"blake3:{hasher.hexdigest()}"
+
+    hash_sha256 = hashlib.new("sha256")  # OpenSSL-backed, so SHA extensions are used where present
+    if size == 0:
+        return f"sha256:{hash_sha256.hexdigest()}"  # Empty files cannot be mapped
+
+    # Feed zero-copy 1 MiB views of the mapping, so time is spent in the hash
+    # loop rather than in read() calls and buffer copies
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with memoryview(mapped) as view:
+            for offset in range(0, len(view), HASH_BUFFER_SIZE):
+                hash_sha256.update(view[offset:offset + HASH_BUFFER_SIZE])
+    return f"sha256:{hash_sha256.hexdigest()}"
+
+def iter_supported_files(directory: str) -> Iterator[str]:
+    """Yield supported files under directory in a single scandir walk."""
+    pending = [directory]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    # Symlinked directories are not followed, so link cycles cannot loop
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS and entry.is_file():
+                        yield entry.path
+        except OSError as e:
+            print(f"  Warning: Cannot read directory: {e}")
+
+@functools.lru_cache(maxsize=None)
+def _load_tokenizer(name: str):
+    """Load a tokenizer once per process, or return None if it is unavailable."""
+    try:
+        from tokenizers import Tokenizer
+        if os.path.exists(name):
+            return Tokenizer.from_file(name)
+        return Tokenizer.from_pretrained(name)
+    except Exception as e:
+        print(f"  Warning: Could not load tokenizer {name}, estimating token counts: {e}")
+        return None
+
+def estimate_chars_per_token(sample: str) -> float:
+    """Estimate how many characters make up one token of sample."""
+    if not sample:
+        return 4.0
+    tokenizer = _load_tokenizer(TOKENIZER_NAME) if TOKENIZER_NAME and HAS_TOKENIZERS else None
+    if tokenizer is not None:
+        tokens = len(tokenizer.encode(sample, add_special_tokens=False).ids)
+    else:
+        # CJK characters are roughly a token each; other scripts average ~4 characters
+        cjk = len(CJK_CHARS.findall(sample))
+        tokens = cjk + (len(sample) - cjk) / 4
+    return len(sample) / max(tokens, 1)
+
+class _EndOfChunks:
+    """Queue sentinel marking the end of a file's chunks."""
+
+    def __reduce__(self):
+        # Unpickle as the module-level instance, so identity checks work across processes
+        return "_END_OF_CHUNKS"
+
+_END_OF_CHUNKS = _EndOfChunks()
+
+def iter_batches(items: Iterable[Optional[dict]], batch_size: int = BATCH_SIZE,
+                 flush_interval: float = BATCH_FLUSH_INTERVAL) -> Iterator[List[dict]]:
+    """Group items into batches, flushing when full or when the oldest item is too old.
+
+    None items are clock ticks: they let a partial batch flush while the producer is slow.
+    """
+    batch = []
+    deadline = 0.0
+    for item in items:
+        if item is not None:
+            if not batch:
+                deadline = time.monotonic() + flush_interval
+            batch.append(item)
+        if batch and (len(batch) >= batch_size or time.monotonic() >= deadline):
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 class DocumentProcessor:
     def __init__(self, api_base_url: str = RAG_API_BASE_URL):
         self.api_base_url = api_base_url.rstrip('/')
-        self.processed_files = set()
+        self._lock = threading.Lock()
+        # Notified whenever a claimed file or chunk hash is settled, stored or released
+        self._settled = threading.Condition(self._lock)
+        self.db = self._open_cache_db(CACHE_DB_FILE)
+        self.processed_files = {row[0] for row in self.db.execute("SELECT hash FROM processed")}
+        self.chunk_index_path = CHUNK_INDEX_FILE
+        self.chunk_hashes = self._load_chunk_hashes()
+        # Hashes claimed by files and chunks still being processed in this run
+        self._claimed_files = set()
+        self._claimed_chunks = set()
+
+        # Keep-alive connection pool shared by all submission threads
+        self.session = create_session()
+        # Caps batch requests across all files; each batch fans out into
+        # EMBEDDING_CONCURRENCY embedding calls on the server
+        self._in_flight = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+        # Event loop and httpx client shared by all uploads, started on first use
+        self._loop = None
+        self._client = None
+
+    def __getstate__(self):
+        """Pickle only what worker processes need for extraction."""
+        state = self.__dict__.copy()
+        state["processed_files"] = set()
+        state["chunk_hashes"] = set()
+        state["_claimed_files"] = set()
+        state["_claimed_chunks"] = set()
+        state["_loop"] = None
+        state["_client"] = None
+        del state["_lock"]
+        del state["_settled"]
+        del state["_in_flight"]
+        del state["session"]
+        del state["db"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._settled = threading.Condition(self._lock)
+        self._in_flight = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+
+    def close(self):
+        """Close the upload client and its event loop, and the keep-alive session."""
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+            self._client = None
+        self.session.close()
 
     def get_file_hash(self, filepath: str) -> str:
-        """Calculate SHA256 hash of file content."""
-        hash_sha256 = hashlib.sha256()
-        with open(filepath, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_sha256.update(chunk)
-        return hash_sha256.hexdigest()
-
-    def extract_text_from_pdf(self, filepath: str) -> str:
-        """Extract text from PDF file."""
+        """Calculate hash of file content, as "blake3:<hex>" or "sha256:<hex>" without blake3."""
+        st = os.stat(filepath)
+        return _cached_file_hash(os.path.abspath(filepath), st.st_mtime_ns, st.st_size)
+
+    def _open_cache_db(self, path: str) -> sqlite3.Connection:
+        """Open the on-disk index of processed files, creating it if needed."""
+        # Shared by submission threads; access is serialized with self._lock
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute("CREATE TABLE IF NOT EXISTS processed (hash TEXT PRIMARY KEY, ts REAL)")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS files "
+            "(path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, hash TEXT)"
+        )
+        db.commit()
+        return db
+
+    def get_file_key(self, filepath: str) -> Tuple[str, int, int]:
+        """Identify a file version by (absolute path, mtime, size)."""
+        st = os.stat(filepath)
+        return str(Path(filepath).resolve()), st.st_mtime_ns, st.st_size
+
+    def is_unchanged(self, file_key: Tuple[str, int, int]) -> bool:
+        """Check whether this exact file version was processed by a previous run."""
+        with self._lock:
+            row = self.db.execute(
+                "SELECT hash FROM files WHERE path = ? AND mtime_ns = ? AND size = ?", file_key
+            ).fetchone()
+            return row is not None and row[0] in self.processed_files
+
+    def _mark_processed(self, file_hash: str, file_key: Optional[Tuple[str, int, int]]):
+        """Persist a processed file hash, and the file version it came from, settling its claim."""
+        with self._settled:
+            self.db.execute("INSERT OR IGNORE INTO processed (hash, ts) VALUES (?, ?)",
+                            (file_hash, time.time()))
+            if file_key is not None:
+                self.db.execute("INSERT OR REPLACE INTO files (path, mtime_ns, size, hash) "
+                                "VALUES (?, ?, ?, ?)", (*file_key, file_hash))
+            self.db.commit()
+            self.processed_files.add(file_hash)
+            self._claimed_files.discard(file_hash)
+            self._settled.notify_all()
+
+    def get_chunk_hash(self, chunk: str) -> bytes:
+        """Calculate a 16-byte BLAKE2b content hash of a chunk.
+
+        The chunk index persists these across runs, so the algorithm must not depend
+        on which optional packages are installed.
+        """
+        return hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).digest()
+
+    def _load_chunk_hashes(self) -> set:
+        """Load hashes of previously uploaded chunks from the chunk index."""
+        if not os.path.exists(self.chunk_index_path):
+            return set()
+        with open(self.chunk_index_path, "r") as f:
+            return {bytes.fromhex(line.strip()) for line in f if line.strip()}
+
+    def _record_chunk_hashes(self, digests: List[bytes]):
+        """Append uploaded chunk hashes to the chunk index in a single write, settling their claims."""
+        if not digests:
+            return
+        lines = "".join(f"{digest.hex()}\n" for digest in digests)
+        with self._settled, open(self.chunk_index_path, "a") as f:
+            f.write(lines)
+            self.chunk_hashes.update(digests)
+            self._claimed_chunks.difference_update(digests)
+            self._settled.notify_all()
+
+    def iter_pdf_pages(self, filepath: str) -> Iterator[str]:
+        """Yield the text of each PDF page, one page at a time."""
+        if HAS_PDFIUM:
+            yield from self._iter_pdfium_pages(filepath)
+            return
         if not HAS_PDF:
             raise ImportError("pdfplumber not installed. Install with: pip install pdfplumber")
 
-        text = ""
+        import pdfplumber
+
         with pdfplumber.open(filepath) as pdf:
             for page in pdf.pages:
                 page_text = page.extract_text()
                 if page_text:
-                    text += page_text + "\n"
-        return text.strip()
+                    yield page_text
+                # Drop parsed layout objects so memory stays O(page)
+                page.flush_cache()
+
+    def _iter_pdfium_pages(self, filepath: str) -> Iterator[str]:
+        """Yield the text of each PDF page using PDFium."""
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument(filepath)
+        try:
+            for page in pdf:
+                textpage = page.get_textpage()
+                page_text = textpage.get_text_range()
+                textpage.close()
+                page.close()
+                if page_text:
+                    # PDFium separates lines with CRLF
+                    yield page_text.replace("\r\n", "\n")
+        finally:
+            pdf.close()
+
+    def extract_text_from_pdf(self, filepath: str) -> str:
+        """Extract text from PDF file."""
+        return "\n".join(self.iter_pdf_pages(filepath)).strip()
 
     def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
         """Split text into chunks with overlap."""
         if len(text) <= chunk_size:
             return [text]
+        return list(self.stream_chunks([text], chunk_size, overlap))
+
+    def iter_chunks(self, pieces: Iterable[str]) -> Iterator[str]:
+        """Chunk a stream of text so each chunk fits in about MAX_TOKENS tokens.
+
+        The character budget is derived from the first TOKEN_SAMPLE_CHARS of the
+        document, so dense scripts such as CJK get proportionally shorter chunks.
+        """
+        pieces = iter(pieces)
+        # Buffer pieces until the sample is full: a PDF's first page is often just a cover
+        head = []
+        sampled = 0
+        for piece in pieces:
+            head.append(piece)
+            sampled += len(piece)
+            if sampled >= TOKEN_SAMPLE_CHARS:
+                break
+        sample = "".join(head)[:TOKEN_SAMPLE_CHARS]
+        chunk_size = max(BREAK_WINDOW * 2, int(MAX_TOKENS * estimate_chars_per_token(sample)))
+        # Keep the same 20% overlap as the character-based defaults
+        yield from self.stream_chunks(itertools.chain(head, pieces), chunk_size, chunk_size // 5)
+
+    def stream_chunks(self, pieces: Iterable[str], chunk_size: int = 1000,
+                      overlap: int = 200) -> Iterator[str]:
+        """Chunk a stream of text pieces, yielding each chunk as soon as it is complete.
+
+        Produces the same chunks as chunk_text on the concatenated pieces while only
+        buffering the not-yet-chunked tail of the stream.
+        """
+        buffer = ""
+        chunked = False
+        for piece in pieces:
+            buffer += piece
+            start = yield from self._chunk_buffer(buffer, chunk_size, overlap, final=False)
+            if start:
+                chunked = True
+                buffer = buffer[start:]
+
+        if not chunked and len(buffer) <= chunk_size:
+            # Short documents are kept whole, as in chunk_text
+            chunk = buffer.strip()
+            if chunk:
+                yield chunk
+        else:
+            yield from self._chunk_buffer(buffer, chunk_size, overlap, final=True)
 
-        chunks = []
+    def _chunk_buffer(self, text: str, chunk_size: int, overlap: int,
+                      final: bool) -> Generator[str, None, int]:
+        """Yield the complete chunks of text and return the offset of the next chunk.
+
+        Unless final, a chunk is only complete once text beyond its end has arrived.
+        """
         start = 0
+        text_len = len(text)
+        limit = text_len if final else text_len - chunk_size
 
-        while start < len(text):
+        while start < limit:
             end = start + chunk_size
+            chunk_end = end
 
             # Try to find a good breaking point (sentence end)
-            if end < len(text):
-                # Look for sentence endings within the last 200 characters
-                search_start = max(start, end - 200)
-                sentence_endings = ['. ', '! ', '? ', '\n\n']
+            if end < text_len:
+                # Only endings starting strictly inside the break window are accepted,
+                # so the search bounds alone decide whether a match qualifies
+                search_start = max(start, end - BREAK_WINDOW + 1)
 
-                best_break = end
-                for ending in sentence_endings:
+                for ending, length, kept in SENTENCE_BREAKS:
                     last_ending = text.rfind(ending, search_start, end)
-                    if last_ending != -1 and last_ending > best_break - 100:
-                        best_break = last_ending + len(ending)
+                    if last_ending != -1:
+                        end = last_ending + length
+                        # Leave the ending's trailing whitespace out of the slice, so
+                        # strip() usually has nothing to remove and returns it as-is
+                        chunk_end = last_ending + kept
                         break
 
-                end = best_break
-
-            chunk = text[start:end].strip()
+            chunk = text[start:chunk_end].strip()
             if chunk:
-                chunks.append(chunk)
+                yield chunk
 
             # Move start position with overlap
             start = max(start + 1, end - overlap)
 
-        return chunks
+        return start
 
     def extract_text_from_docx(self, filepath: str) -> str:
         """Extract text from DOCX file."""
         if not HAS_DOCX:
             raise ImportError("python-docx not installed. Install with: pip install python-docx")
 
+        from docx import Document
+
         doc = Document(filepath)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text.strip()
+        return "\n".join(paragraph.text for paragraph in doc.paragraphs).strip()
 
     def extract_text_from_txt(self, filepath: str) -> str:
         """Extract text from plain text file."""
@@ -133,67 +538,352 @@ class DocumentProcessor:
         }
 
         try:
-            response = requests.post(url, json=payload, timeout=300)
+            response = self.session.post(url, data=json_dumps(payload), headers=JSON_HEADERS, timeout=300)
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return json_loads(response.content)
+        except (requests.exceptions.RequestException, ValueError) as e:
             print(f"Error sending {filename} to API: {e}")
             raise
 
-    def process_file(self, filepath: str) -> bool:
-        """Process a single file."""
-        try:
-            filename = Path(filepath).name
-            print(f"Processing: {filename}")
-
-            # Check if file was already processed (basic check)
-            file_hash = self.get_file_hash(filepath)
-            if file_hash in self.processed_files:
-                print(f"  Skipping (already processed): {filename}")
-                return True
+    def send_batch_to_rag_api(self, items: List[dict]) -> dict:
+        """Send a batch of documents to RAGAPI in a single request."""
+        url = f"{self.api_base_url}/process-documents"
+        body, headers = encode_batch(items)
 
-            # Extract text
-            content = self.extract_text(filepath)
-            if not content:
-                print(f"  Warning: No text extracted from {filename}")
-                return False
+        try:
+            response = self.session.post(url, data=body, headers=headers, timeout=300)
+            response.raise_for_status()
+            return json_loads(response.content)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error sending batch of {len(items)} documents to API: {e}")
+            raise
 
-            print(f"  Extracted {len(content)} characters")
+    def _upload_loop(self) -> asyncio.AbstractEventLoop:
+        """Return the event loop running the shared httpx client, starting both on first use."""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, daemon=True).start()
+                self._client = asyncio.run_coroutine_threadsafe(self._open_client(), loop).result()
+                self._loop = loop
+            return self._loop
+
+    async def _open_client(self) -> "httpx.AsyncClient":
+        """Create the httpx client on the upload loop."""
+        limits = httpx.Limits(max_connections=MAX_IN_FLIGHT, max_keepalive_connections=MAX_IN_FLIGHT)
+        # httpx transports only retry failed connection attempts
+        transport = httpx.AsyncHTTPTransport(limits=limits, retries=HTTP_RETRIES)
+        return httpx.AsyncClient(transport=transport, timeout=300)
+
+    async def _post_batch(self, batch: List[dict], handle_result: Callable[[List[dict], object], None]):
+        """Send one batch on the upload loop, then hand its result to handle_result."""
+        try:
+            body, headers = encode_batch(batch)
+            response = await self._client.post(f"{self.api_base_url}/process-documents",
+                                               content=body, headers=headers)
+            response.raise_for_status()
+            result = json_loads(response.content)
+        except Exception as e:
+            result = e
+        finally:
+            self._in_flight.release()
+        handle_result(batch, result)
+
+    def _submit_concurrent(self, batches: Iterable[List[dict]],
+                           handle_result: Callable[[List[dict], object], None]):
+        """Send batches concurrently as they are produced, waiting until all are done.
+
+        handle_result is called with each batch and its response body or the exception raised.
+        Every file and thread shares one client and at most MAX_IN_FLIGHT requests in flight.
+        """
+        loop = self._upload_loop()
+        pending = []
+        try:
+            for batch in batches:
+                # Block until a request slot is free; each file holds at most one
+                # batch while it waits, so memory stays bounded
+                self._in_flight.acquire()
+                pending.append(asyncio.run_coroutine_threadsafe(
+                    self._post_batch(batch, handle_result), loop))
+        finally:
+            # Let every sent batch settle, even if one of them failed
+            wait(pending)
+        for future in pending:
+            future.result()
+
+    def _submit_sequential(self, batches: Iterable[List[dict]],
+                           handle_result: Callable[[List[dict], object], None]):
+        """Send batches one at a time when httpx is not available, within the run-wide cap."""
+        for batch in batches:
+            try:
+                with self._in_flight:
+                    result = self.send_batch_to_rag_api(batch)
+            except Exception as e:
+                result = e
+            handle_result(batch, result)
+
+    def iter_text_pieces(self, filepath: str) -> Iterator[str]:
+        """Yield a file's text in pieces: page by page for PDFs, whole for other formats."""
+        if Path(filepath).suffix.lower() == '.pdf':
+            for page in self.iter_pdf_pages(filepath):
+                yield page + "\n"
+        else:
+            yield self.extract_text(filepath)
 
-            # Split into chunks for better processing
-            chunks = self.chunk_text(content)
-            print(f"  Split into {len(chunks)} chunks")
+    def submit_chunks(self, file_hash: str, filename: str, chunks: Iterable[Optional[str]],
+                      file_key: Optional[Tuple[str, int, int]] = None) -> bool:
+        """Send the chunks of a file to the RAG API as they become available.
 
-            # Process each chunk
+        file_hash must already be claimed (see _claim). chunks may be a lazy stream;
+        None entries are clock ticks (see iter_batches).
+        """
+        # Claimed chunk digests not yet settled by a batch result, by chunk filename
+        digests = {}
+        try:
+            total_chunks = 0
+            new_chunks = 0
             successful_chunks = 0
-            for i, chunk in enumerate(chunks):
-                try:
-                    # Create a unique filename for each chunk
-                    chunk_filename = f"{filename} [Chunk {i+1}]"
+            # Chunks claimed by another upload in flight when this file reached them
+            shared = set()
+
+            def new_items() -> Iterator[Optional[dict]]:
+                nonlocal total_chunks, new_chunks
+                for chunk in chunks:
+                    if chunk is None:
+                        yield None
+                        continue
+                    total_chunks += 1
+
+                    # Skip chunks whose content was already uploaded, claiming new ones
+                    # so concurrent files with a shared chunk only send it once
+                    digest = self.get_chunk_hash(chunk)
+                    with self._lock:
+                        if digest in self.chunk_hashes:
+                            continue
+                        if digest in self._claimed_chunks:
+                            shared.add(digest)
+                            continue
+                        self._claimed_chunks.add(digest)
+                    new_chunks += 1
 
-                    print(f"    Processing chunk {i+1}/{len(chunks)} ({len(chunk)} chars)")
+                    # Create a unique filename for each chunk
+                    chunk_filename = f"{filename} [Chunk {total_chunks}]"
+                    digests[chunk_filename] = digest
+                    yield {"filename": chunk_filename, "content": chunk}
+
+            def handle_result(batch: List[dict], result):
+                nonlocal successful_chunks
+                batch_digests = [digests.pop(item["filename"]) for item in batch]
+                if isinstance(result, BaseException):
+                    print(f"      Error processing batch of {filename}: {result}")
+                    self._release_chunks(batch_digests)
+                    return
+                print(f"      Success: {result.get('message', 'Processed successfully')}")
+                document_ids = result.get("document_ids") or [True] * len(batch)
+                stored, failed = [], []
+                for digest, document_id in zip(batch_digests, document_ids):
+                    (stored if document_id is not None else failed).append(digest)
+                self._record_chunk_hashes(stored)
+                self._release_chunks(failed)
+                successful_chunks += len(stored)
+
+            batches = iter_batches(new_items())
+            if HAS_HTTPX:
+                self._submit_concurrent(batches, handle_result)
+            else:
+                self._submit_sequential(batches, handle_result)
 
-                    # Send chunk to RAG API
-                    result = self.send_to_rag_api(chunk_filename, chunk)
-                    print(f"      Success: {result.get('message', 'Processed successfully')}")
-                    successful_chunks += 1
+            if total_chunks == 0:
+                print(f"  Warning: No text extracted from {filename}")
+                self._release(file_hash)
+                return False
 
-                except Exception as chunk_error:
-                    print(f"      Error processing chunk {i+1}: {chunk_error}")
-                    continue
+            # Shared chunks only count as done once the upload that claimed them is stored
+            with self._settled:
+                self._settled.wait_for(lambda: self._claimed_chunks.isdisjoint(shared))
+                lost_chunks = len(shared - self.chunk_hashes)
+
+            duplicate_chunks = total_chunks - new_chunks
+            if duplicate_chunks:
+                print(f"    Skipped {duplicate_chunks}/{total_chunks} duplicate chunks of {filename}")
+            if lost_chunks:
+                print(f"  {lost_chunks} chunks of {filename} failed to upload with another file, "
+                      f"the file will be retried next run")
+                self._release(file_hash)
+                return False
+            if new_chunks == 0:
+                print(f"  All chunks of {filename} already processed")
+                self._mark_processed(file_hash, file_key)
+                return True
 
-            if successful_chunks > 0:
-                print(f"  Successfully processed {successful_chunks}/{len(chunks)} chunks")
-                self.processed_files.add(file_hash)
+            if successful_chunks == new_chunks:
+                print(f"  Successfully processed {successful_chunks}/{new_chunks} chunks of {filename}")
+                self._mark_processed(file_hash, file_key)
                 return True
+            elif successful_chunks > 0:
+                # Keep the file out of the index so the next run retries it; chunks
+                # that were stored are in the chunk index and are not sent again
+                print(f"  Processed {successful_chunks}/{new_chunks} chunks of {filename}, "
+                      f"the rest will be retried next run")
+                self._release(file_hash)
+                return False
             else:
-                print(f"  Failed to process any chunks")
+                print(f"  Failed to process any chunks of {filename}")
+                self._release(file_hash)
                 return False
 
+        except Exception as e:
+            print(f"  Error processing {filename}: {e}")
+            # Every sent batch has been settled by now; free claims on chunks that
+            # were never sent (e.g. a partial batch when the parser failed)
+            self._release_chunks(list(digests.values()))
+            self._release(file_hash)
+            return False
+
+    def _claim(self, file_hash: str) -> bool:
+        """Claim a file hash for processing; returns False if it was already processed.
+
+        If a concurrent file holds the claim, wait for it: its hash is only processed
+        once it succeeds, and if it fails the claim passes to this caller.
+        """
+        with self._settled:
+            self._settled.wait_for(lambda: file_hash not in self._claimed_files)
+            if file_hash in self.processed_files:
+                return False
+            self._claimed_files.add(file_hash)
+            return True
+
+    def _release(self, file_hash: str):
+        """Forget a claimed hash so the file can be retried."""
+        with self._settled:
+            self._claimed_files.discard(file_hash)
+            self._settled.notify_all()
+
+    def _release_chunks(self, digests: List[bytes]):
+        """Forget claimed chunk hashes that failed to upload."""
+        with self._settled:
+            self._claimed_chunks.difference_update(digests)
+            self._settled.notify_all()
+
+    def process_file(self, filepath: str, parser: Optional[Executor] = None, manager=None,
+                     hash_future: Optional[Future] = None) -> bool:
+        """Process a single file, uploading chunks while the rest of it is still being parsed.
+
+        The file is parsed on parser, a one-off thread by default. Parsing in a process
+        pool also needs a multiprocessing manager, whose queues can cross processes.
+        hash_future may hold the file's hash, computed ahead of time.
+        """
+        if parser is None:
+            with ThreadPoolExecutor(max_workers=1) as parser:
+                return self.process_file(filepath, parser, hash_future=hash_future)
+
+        filename = Path(filepath).name
+        print(f"Processing: {filename}")
+        try:
+            file_key = self.get_file_key(filepath)
+            if self.is_unchanged(file_key):
+                print(f"  Skipping (unchanged since last run): {filename}")
+                return True
+            file_hash = hash_future.result() if hash_future is not None else self.get_file_hash(filepath)
         except Exception as e:
             print(f"  Error processing {filename}: {e}")
             return False
 
+        # Claim the hash before parsing, so content already processed by an earlier
+        # run, or by a concurrent duplicate that succeeded, is skipped without being parsed
+        if not self._claim(file_hash):
+            print(f"  Skipping (already processed): {filename}")
+            self._mark_processed(file_hash, file_key)
+            return True
+
+        try:
+            # Parse and chunk on the parser; the bounded queue keeps at most
+            # CHUNK_QUEUE_SIZE chunks in memory regardless of document size
+            queue_size = max(1, CHUNK_QUEUE_SIZE // CHUNK_GROUP_SIZE)
+            if manager is None:
+                chunk_queue, stop = queue.Queue(maxsize=queue_size), threading.Event()
+            else:
+                chunk_queue, stop = manager.Queue(maxsize=queue_size), manager.Event()
+            producer = parser.submit(self._produce_chunks, filepath, chunk_queue, stop)
+        except Exception as e:
+            print(f"  Error processing {filename}: {e}")
+            self._release(file_hash)
+            return False
+
+        try:
+            chunks = self._consume_chunks(chunk_queue, producer)
+            return self.submit_chunks(file_hash, filename, chunks, file_key)
+        finally:
+            stop.set()
+            producer.cancel()
+            wait([producer])
+
+    def _produce_chunks(self, filepath: str, chunk_queue: queue.Queue, stop: threading.Event):
+        """Put a file's chunks on chunk_queue in lists, followed by _END_OF_CHUNKS or the error raised.
+
+        A list is queued once it holds CHUNK_GROUP_SIZE chunks, and before the next
+        text piece is parsed, so finished chunks never wait on a slow parser.
+        """
+        group = []
+
+        def flush() -> bool:
+            nonlocal group
+            if group and not self._put_chunk(chunk_queue, group, stop):
+                return False
+            group = []
+            return True
+
+        def pieces() -> Iterator[str]:
+            parsed = self.iter_text_pieces(filepath)
+            while flush():
+                piece = next(parsed, None)
+                if piece is None:
+                    return
+                yield piece
+
+        try:
+            for chunk in self.iter_chunks(pieces()):
+                group.append(chunk)
+                if len(group) >= CHUNK_GROUP_SIZE and not flush():
+                    return
+            if not flush():
+                return
+            item = _END_OF_CHUNKS
+        except Exception as e:
+            item = e
+        self._put_chunk(chunk_queue, item, stop)
+
+    def _put_chunk(self, chunk_queue: queue.Queue, item, stop: threading.Event) -> bool:
+        """Block until item is queued; returns False if the consumer gave up first."""
+        while not stop.is_set():
+            try:
+                chunk_queue.put(item, timeout=BATCH_FLUSH_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _consume_chunks(self, chunk_queue: queue.Queue, producer: Future) -> Iterator[Optional[str]]:
+        """Yield chunks from chunk_queue, with None ticks while waiting on the parser."""
+        while True:
+            try:
+                item = chunk_queue.get(timeout=BATCH_FLUSH_INTERVAL)
+            except queue.Empty:
+                if not producer.done():
+                    yield None
+                    continue
+                # Everything a finished producer queued is already there
+                try:
+                    item = chunk_queue.get_nowait()
+                except queue.Empty:
+                    producer.result()  # Raises if the parser crashed
+                    raise RuntimeError("Parser stopped before the end of the file")
+            if item is _END_OF_CHUNKS:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield from item
+
     def process_directory(self, directory: str) -> Tuple[int, int]:
         """Process all files in directory."""
         dir_path = Path(directory)
@@ -201,54 +891,82 @@ class DocumentProcessor:
         if not dir_path.exists():
             raise FileNotFoundError(f"Directory not found: {directory}")
 
-        # Supported file extensions
-        supported_exts = ['.pdf', '.docx', '.txt', '.md']
-
-        files = []
-        for ext in supported_exts:
-            files.extend(dir_path.glob(f"**/*{ext}"))
+        files = [Path(path) for path in iter_supported_files(directory)]
 
         if not files:
             print(f"No supported files found in {directory}")
-            print(f"Supported formats: {', '.join(supported_exts)}")
+            print(f"Supported formats: {', '.join(SUPPORTED_EXTENSIONS)}")
             return 0, 0
 
-        print(f"Found {len(files)} files to process")
+        print(f"Found {len(files)} files to process ({MAX_WORKERS} extraction workers)")
 
-        success_count = 0
         total_count = len(files)
+        skipped_count = 0
 
+        # Files untouched since a previous run are skipped without hashing; files
+        # that cannot be checked (e.g. deleted since the scan) count as failed
+        file_keys = {}
         for filepath in files:
-            if self.process_file(str(filepath)):
-                success_count += 1
+            try:
+                file_key = self.get_file_key(str(filepath))
+                unchanged = self.is_unchanged(file_key)
+            except Exception as e:
+                print(f"  Error processing {filepath.name}: {e}")
+                continue
+            if unchanged:
+                print(f"  Skipping (unchanged since last run): {filepath.name}")
+                skipped_count += 1
+            else:
+                file_keys[filepath] = file_key
+
+        if MAX_WORKERS <= 1:
+            # A single worker gains nothing from a process pool; parse on one thread,
+            # hashing ahead on another (hashing releases the GIL), so files whose
+            # content was already processed are skipped without being parsed
+            with ThreadPoolExecutor(max_workers=1) as parser, ThreadPoolExecutor(max_workers=1) as hasher:
+                hashes = [hasher.submit(self.get_file_hash, str(fp)) for fp in file_keys]
+                success_count = skipped_count + sum(
+                    1 for fp, hash_future in zip(file_keys, hashes)
+                    if self.process_file(str(fp), parser, hash_future=hash_future))
+            return success_count, total_count
+
+        # Parse in worker processes and upload from a thread per file. Each upload
+        # thread hashes its file first, overlapping with other files being parsed,
+        # and chunks stream back through bounded manager queues, so as in the
+        # single-worker pipeline memory does not grow with document size.
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as pool, multiprocessing.Manager() as manager, \
+                ThreadPoolExecutor(max_workers=SUBMIT_WORKERS) as sender:
+            # Fork the workers from this thread before any upload threads exist
+            pool.submit(os.getpid).result()
+            results = sender.map(lambda fp: self.process_file(str(fp), pool, manager), file_keys)
+            success_count = skipped_count + sum(1 for ok in results if ok)
 
         return success_count, total_count
 
-def check_api_health() -> bool:
+def check_api_health(session: Optional[requests.Session] = None) -> bool:
     """Check if RAGAPI is running and healthy."""
     try:
-        response = requests.get(f"{RAG_API_BASE_URL}/health", timeout=10)
+        response = (session or requests).get(f"{RAG_API_BASE_URL}/health", timeout=10)
         response.raise_for_status()
-        data = response.json()
+        data = json_loads(response.content)
         print(f"API Health: {data.get('status', 'Unknown')}")
         return True
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"API health check failed: {e}")
         print("Make sure the RAGAPI server is running on the correct port.")
         return False
 
-def install_dependencies():
-    """Install required Python packages."""
+def check_dependencies() -> bool:
+    """Check that the required Python packages are installed."""
     packages = []
-    if not HAS_PDF:
+    if not HAS_PDF and not HAS_PDFIUM:
         packages.append("pdfplumber")
     if not HAS_DOCX:
         packages.append("python-docx")
 
     if packages:
-        print(f"Installing missing dependencies: {', '.join(packages)}")
-        os.system(f"pip install {' '.join(packages)}")
-        print("Please restart the script after installation.")
+        print(f"Missing dependencies: {', '.join(packages)}")
+        print(f"Install with: pip install {' '.join(packages)}")
         return False
     return True
 
@@ -257,19 +975,19 @@ def main():
     print("=" * 40)
 
     # Check dependencies
-    if not install_dependencies():
-        return
+    if not check_dependencies():
+        sys.exit(2)
+
+    # Initialize processor
+    processor = DocumentProcessor()
 
     # Check API health
-    if not check_api_health():
+    if not check_api_health(processor.session):
         print("\nTo start the RAGAPI server:")
         print("  cd services/RAGAPI")
         print("  cargo run")
         return
 
-    # Initialize processor
-    processor = DocumentProcessor()
-
     # Process documents
     try:
         success_count, total_count = processor.process_directory(DOCUMENTS_DIR)
@@ -282,6 +1000,8 @@ def main():
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
+    finally:
+        processor.close()
 
 if __name__ == "__main__":
     main()
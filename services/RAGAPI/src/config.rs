@@ -13,6 +13,7 @@ pub struct Config {
     pub ui_config_api_url: String,
     pub embedding_model: String,
     pub embedding_dimension: usize,
+    pub embedding_concurrency: usize,
 }
 
 impl Config {
@@ -43,6 +44,9 @@ impl Config {
             embedding_dimension: env::var("EMBEDDING_DIMENSION")
                 .unwrap_or_else(|_| "1536".to_string())
                 .parse()?,
+            embedding_concurrency: env::var("EMBEDDING_CONCURRENCY")
+                .unwrap_or_else(|_| "16".to_string())
+                .parse()?,
         })
     }
 
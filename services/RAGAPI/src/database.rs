@@ -3,6 +3,15 @@ use chrono::{DateTime, Utc};
 use pgvector::Vector;
 use serde::{Deserialize, Serialize};
 use sqlx::{FromRow, PgPool, Row};
+use std::collections::HashMap;
+
+// SHA-256 of a document's content, stored as documents.file_hash
+fn content_hash(content: &str) -> String {
+    use sha2::{Digest, Sha256};
+    let mut hasher = Sha256::new();
+    hasher.update(content);
+    hex::encode(hasher.finalize())
+}
 
 #[derive(Debug, FromRow, Serialize, Deserialize)]
 pub struct Document {
@@ -168,10 +177,7 @@ impl Database {
     ) -> Result<i32> {
         use tracing::info;
 
-        use sha2::{Digest, Sha256};
-        let mut hasher = Sha256::new();
-        hasher.update(content);
-        let file_hash = hex::encode(hasher.finalize());
+        let file_hash = content_hash(content);
         let query_vector = Vector::from(embedding.to_vec());
 
         // Begin transaction
@@ -211,6 +217,95 @@ impl Database {
         Ok(document_id)
     }
 
+    /// Look up documents already stored with the same content, returning their ids in input order
+    pub async fn find_documents_by_content(&self, contents: &[&str]) -> Result<Vec<Option<i32>>> {
+        let hashes: Vec<String> = contents.iter().map(|content| content_hash(content)).collect();
+
+        let rows = sqlx::query(
+            r#"
+            SELECT id, file_hash
+            FROM documents
+            WHERE chunk_index = 0 AND file_hash = ANY($1)
+            "#,
+        )
+        .bind(&hashes)
+        .fetch_all(&self.pool)
+        .await?;
+
+        let existing: HashMap<String, i32> = rows
+            .iter()
+            .map(|row| (row.get::<String, _>("file_hash"), row.get::<i32, _>("id")))
+            .collect();
+        Ok(hashes.iter().map(|hash| existing.get(hash).copied()).collect())
+    }
+
+    /// Store a document and its embedding unless the same content is already stored,
+    /// returning the id of the new or existing document
+    pub async fn store_document_and_embedding_if_new(
+        &self,
+        filename: &str,
+        content: &str,
+        embedding: &[f32],
+    ) -> Result<i32> {
+        use tracing::info;
+
+        let file_hash = content_hash(content);
+        let query_vector = Vector::from(embedding.to_vec());
+
+        let mut tx = self.pool.begin().await?;
+
+        let inserted = sqlx::query(
+            r#"
+            INSERT INTO documents (filename, content, file_hash, chunk_index)
+            VALUES ($1, $2, $3, 0)
+            ON CONFLICT (file_hash, chunk_index) DO NOTHING
+            RETURNING id
+            "#,
+        )
+        .bind(filename)
+        .bind(content)
+        .bind(&file_hash)
+        .fetch_optional(&mut *tx)
+        .await?;
+
+        let document_id: i32 = match inserted {
+            Some(row) => row.get("id"),
+            None => {
+                // Stored by an earlier upload (or a concurrent one), so keep that row
+                let existing: i32 = sqlx::query(
+                    r#"
+                    SELECT id
+                    FROM documents
+                    WHERE file_hash = $1 AND chunk_index = 0
+                    "#,
+                )
+                .bind(&file_hash)
+                .fetch_one(&mut *tx)
+                .await?
+                .get("id");
+                tx.commit().await?;
+                info!("Document {} already stored as {}", filename, existing);
+                return Ok(existing);
+            }
+        };
+
+        sqlx::query(
+            r#"
+            INSERT INTO embeddings (document_id, embedding)
+            VALUES ($1, $2)
+            "#,
+        )
+        .bind(document_id)
+        .bind(&query_vector)
+        .execute(&mut *tx)
+        .await?;
+
+        tx.commit().await?;
+
+        info!("Stored document {} with embedding (dimension: {})", filename, embedding.len());
+        Ok(document_id)
+    }
+
     pub async fn get_document_content(&self, document_id: i32) -> Result<Option<(String, String)>> {
         let row = sqlx::query(
             r#"
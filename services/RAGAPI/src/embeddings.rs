@@ -15,6 +15,33 @@ impl EmbeddingService {
     pub async fn get_embedding(&self, text: &str) -> Result<Vec<f32>> {
         info!("Generating embedding for text (length: {}): {}", text.len(), text);
 
+        let response_body = match self.invoke_model(text).await {
+            Ok(body) => body,
+            Err(e) => {
+                error!("{}", e);
+                warn!("Using mock embedding due to AWS credential issues");
+                let mock_embedding: Vec<f32> = (0..1536).map(|i| (i as f32 * 0.001).sin()).collect();
+                return Ok(mock_embedding);
+            }
+        };
+
+        Self::parse_embedding(&response_body)
+    }
+
+    /// Like get_embedding, but Bedrock errors (including throttling) are returned
+    /// instead of being replaced by a mock vector, so callers can retry them.
+    pub async fn try_get_embedding(&self, text: &str) -> Result<Vec<f32>> {
+        info!("Generating embedding for text (length: {})", text.len());
+
+        let response_body = self.invoke_model(text).await.map_err(|e| {
+            error!("{}", e);
+            e
+        })?;
+
+        Self::parse_embedding(&response_body)
+    }
+
+    async fn invoke_model(&self, text: &str) -> Result<Blob> {
         let body = json!({
             "inputText": text
         });
@@ -26,20 +53,14 @@ impl EmbeddingService {
             .content_type("application/json")
             .body(Blob::new(body.to_string()))
             .send()
-            .await;
+            .await
+            .map_err(|e| anyhow!("AWS Bedrock API error: {:?}", e))?;
 
-        let response = match response {
-            Ok(resp) => resp,
-            Err(e) => {
-                error!("AWS Bedrock API error: {:?}", e);
-                warn!("Using mock embedding due to AWS credential issues");
-                let mock_embedding: Vec<f32> = (0..1536).map(|i| (i as f32 * 0.001).sin()).collect();
-                return Ok(mock_embedding);
-            }
-        };
+        Ok(response.body)
+    }
 
-        let response_body = response.body.as_ref();
-        let response_str = std::str::from_utf8(response_body)?;
+    fn parse_embedding(response_body: &Blob) -> Result<Vec<f32>> {
+        let response_str = std::str::from_utf8(response_body.as_ref())?;
         let response_json: serde_json::Value = serde_json::from_str(response_str)?;
 
         let embedding: Vec<f32> = response_json["embedding"]
@@ -2,8 +2,9 @@ use crate::auth_client::AuthClient;
 use crate::bedrock_client::RAGRequest;
 use crate::rag::{RAGResponse, RAGService, RAGStats};
 use axum::{
+    body::Bytes,
     extract::State,
-    http::{HeaderMap, StatusCode},
+    http::{header::CONTENT_TYPE, HeaderMap, StatusCode},
     response::Json,
     Json as RequestJson,
 };
@@ -258,6 +259,20 @@ pub struct ProcessDocumentResponse {
     pub message: String,
 }
 
+#[derive(Debug, Deserialize)]
+pub struct ProcessDocumentsRequest {
+    pub documents: Vec<ProcessDocumentRequest>,
+}
+
+#[derive(Debug, Serialize)]
+pub struct ProcessDocumentsResponse {
+    pub success: bool,
+    pub processed: usize,
+    pub failed: usize,
+    pub document_ids: Vec<Option<i32>>,
+    pub message: String,
+}
+
 #[derive(Debug, Deserialize)]
 pub struct GenerateEmbeddingRequest {
     pub text: String,
@@ -429,6 +444,100 @@ pub async fn process_document(
     }
 }
 
+// Decode a document batch sent as JSON or, with Content-Type application/msgpack, MessagePack
+fn decode_documents_request(headers: &HeaderMap, body: &[u8]) -> Result<ProcessDocumentsRequest, (StatusCode, Json<ErrorResponse>)> {
+    let content_type = headers
+        .get(CONTENT_TYPE)
+        .and_then(|value| value.to_str().ok())
+        .unwrap_or("application/json");
+
+    let decoded: Result<ProcessDocumentsRequest, String> = if content_type.starts_with("application/msgpack") {
+        rmp_serde::from_slice(body).map_err(|e| e.to_string())
+    } else {
+        serde_json::from_slice(body).map_err(|e| e.to_string())
+    };
+
+    decoded.map_err(|e| {
+        (
+            StatusCode::BAD_REQUEST,
+            Json(ErrorResponse {
+                error: ErrorDetails {
+                    code: "VALIDATION_ERROR".to_string(),
+                    message: format!("Invalid document batch: {}", e),
+                    timestamp: chrono::Utc::now().to_rfc3339(),
+                },
+            }),
+        )
+    })
+}
+
+pub async fn process_documents(
+    State(app_state): State<AppState>,
+    headers: HeaderMap,
+    body: Bytes,
+) -> Result<Json<ProcessDocumentsResponse>, (StatusCode, Json<ErrorResponse>)> {
+    let request = decode_documents_request(&headers, &body)?;
+    info!("Processing batch of {} documents", request.documents.len());
+
+    if request.documents.is_empty() {
+        return Err((
+            StatusCode::BAD_REQUEST,
+            Json(ErrorResponse {
+                error: ErrorDetails {
+                    code: "VALIDATION_ERROR".to_string(),
+                    message: "Document batch is empty".to_string(),
+                    timestamp: chrono::Utc::now().to_rfc3339(),
+                },
+            }),
+        ));
+    }
+
+    let documents: Vec<(&str, &str)> = request
+        .documents
+        .iter()
+        .map(|doc| (doc.filename.as_str(), doc.content.as_str()))
+        .collect();
+
+    let mut document_ids = Vec::with_capacity(documents.len());
+    for ((filename, _), result) in documents
+        .iter()
+        .zip(app_state.rag_service.process_documents(&documents).await)
+    {
+        match result {
+            Ok(document_id) => document_ids.push(Some(document_id)),
+            Err(e) => {
+                error!("Failed to process document {}: {}", filename, e);
+                document_ids.push(None);
+            }
+        }
+    }
+
+    let processed = document_ids.iter().filter(|id| id.is_some()).count();
+    let failed = document_ids.len() - processed;
+
+    if processed == 0 {
+        return Err((
+            StatusCode::INTERNAL_SERVER_ERROR,
+            Json(ErrorResponse {
+                error: ErrorDetails {
+                    code: "PROCESSING_FAILED".to_string(),
+                    message: format!("Failed to process all {} documents in batch", failed),
+                    timestamp: chrono::Utc::now().to_rfc3339(),
+                },
+            }),
+        ));
+    }
+
+    info!("Processed batch: {} succeeded, {} failed", processed, failed);
+    Ok(Json(ProcessDocumentsResponse {
+        success: failed == 0,
+        processed,
+        failed,
+        document_ids,
+        message: format!("Processed {}/{} documents", processed, processed + failed),
+    }))
+}
+
 #[derive(Debug, Serialize)]
 pub struct RagModelsResponse {
     pub rag_models: Vec<crate::database::RagModel>,
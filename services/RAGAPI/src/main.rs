@@ -19,12 +19,13 @@ use backends::backend_manager::BackendManager;
 use config::Config;
 use database::Database;
 use embeddings::EmbeddingService;
-use handlers::{health, query, search_documents, stats, process_document, generate_embedding, process_stored_document, get_rag_models, AppState};
+use handlers::{health, query, search_documents, stats, process_document, process_documents, generate_embedding, process_stored_document, get_rag_models, AppState};
 use rag::RAGService;
 use sqlx::postgres::PgPoolOptions;
 use std::sync::Arc;
 use tower::ServiceBuilder;
 use tower_http::cors::{Any, CorsLayer};
+use tower_http::decompression::RequestDecompressionLayer;
 use tracing::{info, Level};
 use tracing_subscriber;
 
@@ -71,7 +72,12 @@ async fn main() -> Result<()> {
     info!("Skipping automatic embedding generation during startup");
 
     let bedrock_api_client = bedrock_client::BedrockApiClient::new(config.bedrock_api_url.clone());
-    let rag_service = RAGService::new(database, embedding_service, bedrock_api_client);
+    let rag_service = RAGService::new(
+        database,
+        embedding_service,
+        bedrock_api_client,
+        config.embedding_concurrency,
+    );
     
     // Initialize AuthClient
     let auth_client = AuthClient::new(config.auth_api_url.clone());
@@ -96,11 +102,17 @@ async fn main() -> Result<()> {
         .route("/query", post(query))
         .route("/search", post(search_documents))
         .route("/process-document", post(process_document))
+        .route("/process-documents", post(process_documents))
         .route("/generate-embedding", post(generate_embedding))
         .route("/process-stored-document", post(process_stored_document))
         .route("/rag-models", get(get_rag_models))
         .with_state(app_state)
-        .layer(ServiceBuilder::new().layer(cors));
+        .layer(
+            ServiceBuilder::new()
+                .layer(cors)
+                // Accept zstd-compressed request bodies (Content-Encoding: zstd)
+                .layer(RequestDecompressionLayer::new()),
+        );
 
     // Start the server
     let bind_address = config.bind_address();
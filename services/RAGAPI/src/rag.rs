@@ -1,10 +1,16 @@
 use crate::bedrock_client::{BedrockApiClient, RAGRequest};
 use crate::database::Database;
 use crate::embeddings::EmbeddingService;
-use anyhow::Result;
+use anyhow::{anyhow, Result};
+use futures::stream::{self, StreamExt};
 use serde::{Deserialize, Serialize};
+use tokio::sync::Semaphore;
 use tracing::{info, warn};
 
+/// Maximum number of documents of one batch in progress at once; Bedrock calls
+/// are further limited across all batches by RAGService::embedding_permits
+const BATCH_CONCURRENCY: usize = 16;
+
 #[derive(Debug, Serialize, Deserialize)]
 pub struct RAGResponse {
     pub answer: String,
@@ -25,6 +31,8 @@ pub struct RAGService {
     pub database: Database,
     pub embedding_service: EmbeddingService,
     pub bedrock_client: BedrockApiClient,
+    /// Bedrock embedding calls allowed at once for document ingestion, shared by all requests
+    embedding_permits: Semaphore,
 }
 
 impl RAGService {
@@ -32,11 +40,13 @@ impl RAGService {
         database: Database,
         embedding_service: EmbeddingService,
         bedrock_client: BedrockApiClient,
+        embedding_concurrency: usize,
     ) -> Self {
         Self {
             database,
             embedding_service,
             bedrock_client,
+            embedding_permits: Semaphore::new(embedding_concurrency.max(1)),
         }
     }
 
@@ -236,6 +246,60 @@ impl RAGService {
         // Store the document and embedding in database
         self.database.store_document_and_embedding(filename, content, &embedding).await
     }
+
+    // Embed a document while holding one of the shared Bedrock permits
+    async fn embed_for_ingest(&self, content: &str) -> Result<Vec<f32>> {
+        let _permit = self.embedding_permits.acquire().await?;
+        self.embedding_service.try_get_embedding(content).await
+    }
+
+    pub async fn process_documents(
+        &self,
+        documents: &[(&str, &str)],
+    ) -> Vec<Result<i32>> {
+        // Content the server already holds keeps its existing row, so resending a
+        // batch (after a client retry or a lost index) is idempotent
+        let contents: Vec<&str> = documents.iter().map(|(_, content)| *content).collect();
+        let existing = match self.database.find_documents_by_content(&contents).await {
+            Ok(existing) => existing,
+            Err(e) => {
+                let message = e.to_string();
+                return documents.iter().map(|_| Err(anyhow!(message.clone()))).collect();
+            }
+        };
+
+        // Titan has no batch embedding endpoint, so embed the batch concurrently.
+        // Bedrock errors fail the document rather than storing a mock vector, so
+        // throttled chunks are reported to the client and retried.
+        let embeddings: Vec<Option<Result<Vec<f32>>>> = stream::iter(documents.iter().zip(&existing))
+            .map(|((_, content), existing_id)| async move {
+                if existing_id.is_some() {
+                    return None;
+                }
+                Some(self.embed_for_ingest(content).await)
+            })
+            .buffered(BATCH_CONCURRENCY)
+            .collect()
+            .await;
+
+        let mut results = Vec::with_capacity(documents.len());
+        for (((filename, content), existing_id), embedding) in
+            documents.iter().zip(existing).zip(embeddings)
+        {
+            let result = match (existing_id, embedding) {
+                (Some(document_id), _) => Ok(document_id),
+                (None, Some(Ok(embedding))) => {
+                    self.database
+                        .store_document_and_embedding_if_new(filename, content, &embedding)
+                        .await
+                }
+                (None, Some(Err(e))) => Err(e),
+                (None, None) => unreachable!("documents without a stored id are always embedded"),
+            };
+            results.push(result);
+        }
+        results
+    }
 }
 
 #[derive(Debug, Serialize, Deserialize)]